@@ -1,13 +1,17 @@
 import os
 import re
+import sys
+import atexit
+import functools
+import stat
+import time
 from dotenv import load_dotenv
-from anthropic import Anthropic
 
-from rich.console import Console
+from rich.console import Console, Group
 from rich.panel import Panel
-from rich.markdown import Markdown
 from rich.table import Table
 from rich.live import Live
+from rich.text import Text
 
 from prompt_toolkit import prompt
 from prompt_toolkit.history import InMemoryHistory
@@ -23,6 +27,84 @@ from chat.storage import StorageMixin
 from chat.web import WebMixin
 
 
+@functools.lru_cache(maxsize=1)
+def _get_api_key():
+    """Reads the API key from .env / the environment once per process."""
+    load_dotenv()
+    return os.environ.get('api_key')
+
+
+@functools.lru_cache(maxsize=1)
+def _markdown_class():
+    """Returns the Markdown renderable class, imported on first use and cached.
+    rich.markdown pulls in markdown-it, so we only pay for it once Claude replies.
+    """
+    from rich.markdown import Markdown
+    return Markdown
+
+
+def _pooled_http_client():
+    """Builds the SDK's HTTP client with one long-lived connection pool, so every
+    message reuses the same TLS connection instead of handshaking again.
+    Returns None (use the SDK default) if this SDK version doesn't support it.
+    """
+    try:
+        from anthropic import DefaultHttpxClient
+        # DefaultHttpxClient subclasses the SDK's HTTP library (httpx in older
+        # releases, httpx2 in newer ones); take Limits from that same library
+        base = next(cls for cls in DefaultHttpxClient.__mro__ if not cls.__module__.startswith("anthropic"))
+        http_lib = sys.modules[base.__module__.split(".")[0]]
+        try:
+            import h2  # noqa: F401 — HTTP/2 only works when h2 is installed
+            use_http2 = True
+        except ImportError:
+            use_http2 = False
+        return DefaultHttpxClient(
+            http2=use_http2,
+            limits=http_lib.Limits(max_keepalive_connections=4, keepalive_expiry=300.0),
+        )
+    except Exception:
+        return None
+
+
+# Matches "@file <path>" plus any whitespace after it, so the ref can be cut out cleanly
+_FILE_REF_RE = re.compile(r'@file\s+(\S+)\s*')
+
+# Prompt-caching marker for content blocks (Anthropic keeps the cache ~5 minutes)
+_EPHEMERAL = {"type": "ephemeral"}
+
+# Always sent as the start of the system prompt, before any persona
+_BASE_INSTRUCTIONS = (
+    "Never start your response with a title or heading. Jump straight into the answer.\n\n"
+    "IMPORTANT: You are running inside 'Claude Chat', a feature-rich terminal chatbot. "
+    "You are NOT running in a browser or API playground. "
+    "When the user asks about your capabilities, how to do something, or asks for help, "
+    "you MUST answer based on the actual features of this app listed below. "
+    "Do NOT give generic answers about what Claude can or can't do — "
+    "answer based on what THIS app supports:\n\n"
+    "FEATURES THE USER CAN USE (type these as their message):\n"
+    "- switch_model → change between Opus, Sonnet, and Haiku models\n"
+    "- brain → change response depth (128 to 4096 tokens)\n"
+    "- persona → pick a personality preset or write a custom system prompt\n"
+    "- theme → switch between 6 color themes (Ocean, Sunset, Forest, Neon, Monochrome, Dracula)\n"
+    "- voice → speak a message into the mic and hear the reply read aloud (Windows only)\n"
+    "- voice_settings → pick a TTS voice and adjust speed\n"
+    "- search → search the web via DuckDuckGo, results are fed to you as context\n"
+    "- save → save the conversation to a JSON file\n"
+    "- load → load a previously saved conversation\n"
+    "- export → export the chat as a readable Markdown file\n"
+    "- clear → clear the conversation history and start fresh\n"
+    "- help → show the animated help panel with all commands\n"
+    "- @file <path> → attach a local file (e.g. '@file chat/app.py explain this'). "
+    "The file contents are sent to you so you can read, review, explain, or debug code\n"
+    '- """ → enter multi-line input mode for pasting code blocks or long text\n'
+    "- quit / exit / q → exit with a session summary showing tokens and cost\n\n"
+    "The user's preferences (model, brain mode, theme) are saved automatically between sessions. "
+    "When asked about files, sharing code, uploading, etc. — always mention the @file command. "
+    "When asked about searching — always mention the search command or trigger phrases."
+)
+
+
 class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
     """
     The main chatbot class. Inherits display, voice, storage, and web from mixins.
@@ -35,17 +117,28 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
         "Sonnet": {"input": 3.00,  "output": 15.00},
         "Haiku":  {"input": 0.80,  "output": 4.00},
     }
+    CACHE_WRITE_RATE = 1.25  # prompt-cache writes cost 1.25x the input price
+    CACHE_READ_RATE = 0.10   # prompt-cache hits cost 0.1x the input price
+
+    STREAM_FPS = 15  # Live refresh rate while a reply streams in
+
+    TRIM_AT = 0.85  # trim history once a prompt would pass this share of context_limit
+    TRIM_TO = 0.75  # ...and cut it back to this share
+
+    _EXIT_WORDS = frozenset({"quit", "exit", "q"})
+    _EXIT = object()  # dispatch-table marker for the exit words
 
     # --- SETUP ---
 
     def __init__(self):
         """Runs when we create the chatbot object. Sets everything up."""
 
-        load_dotenv()
         self.console = Console()
         self.project_root = os.path.dirname(os.path.dirname(__file__))
+        # Project root with a trailing separator, so relative @file paths are a plain concat
+        self._project_root_sep = os.path.join(self.project_root, "")
 
-        api_key = os.getenv('api_key')
+        api_key = _get_api_key()
         if not api_key:
             self.console.print(Panel(
                 "[bold red]API key not found[/bold red]\n\n"
@@ -57,38 +150,20 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
                 padding=(1, 2),
             ))
             exit(1)
-        self.client = Anthropic(api_key=api_key)
+        # Imported here so a missing API key doesn't pay for loading the SDK
+        from anthropic import Anthropic
+        http_client = _pooled_http_client()
+        if http_client is not None:
+            self.client = Anthropic(api_key=api_key, http_client=http_client)
+        else:
+            self.client = Anthropic(api_key=api_key)
         self.conversation = []
+        self._exchanges = 0  # completed user/assistant pairs, kept in step with conversation
+        self._exchange_tokens = []  # rough token count of each of those pairs
         self.system_prompt = ""
-        self.base_instructions = (
-            "Never start your response with a title or heading. Jump straight into the answer.\n\n"
-            "IMPORTANT: You are running inside 'Claude Chat', a feature-rich terminal chatbot. "
-            "You are NOT running in a browser or API playground. "
-            "When the user asks about your capabilities, how to do something, or asks for help, "
-            "you MUST answer based on the actual features of this app listed below. "
-            "Do NOT give generic answers about what Claude can or can't do — "
-            "answer based on what THIS app supports:\n\n"
-            "FEATURES THE USER CAN USE (type these as their message):\n"
-            "- switch_model → change between Opus, Sonnet, and Haiku models\n"
-            "- brain → change response depth (128 to 4096 tokens)\n"
-            "- persona → pick a personality preset or write a custom system prompt\n"
-            "- theme → switch between 6 color themes (Ocean, Sunset, Forest, Neon, Monochrome, Dracula)\n"
-            "- voice → speak a message into the mic and hear the reply read aloud (Windows only)\n"
-            "- voice_settings → pick a TTS voice and adjust speed\n"
-            "- search → search the web via DuckDuckGo, results are fed to you as context\n"
-            "- save → save the conversation to a JSON file\n"
-            "- load → load a previously saved conversation\n"
-            "- export → export the chat as a readable Markdown file\n"
-            "- clear → clear the conversation history and start fresh\n"
-            "- help → show the animated help panel with all commands\n"
-            "- @file <path> → attach a local file (e.g. '@file chat/app.py explain this'). "
-            "The file contents are sent to you so you can read, review, explain, or debug code\n"
-            '- """ → enter multi-line input mode for pasting code blocks or long text\n'
-            "- quit / exit / q → exit with a session summary showing tokens and cost\n\n"
-            "The user's preferences (model, brain mode, theme) are saved automatically between sessions. "
-            "When asked about files, sharing code, uploading, etc. — always mention the @file command. "
-            "When asked about searching — always mention the search command or trigger phrases."
-        )
+        self._system_cache = None      # base instructions + persona, see _system_text()
+        self._system_cache_key = None  # the system_prompt that cache was built from
+        self.base_instructions = _BASE_INSTRUCTIONS
         self.total_input_tokens = 0
         self.total_output_tokens = 0
         self.total_cost = 0.0
@@ -111,6 +186,9 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
             "4": ("Detailed", 2048),
             "5": ("Maximum", 4096),
         }
+        # Reverse lookups (display name -> menu key) used when saving the config
+        self._model_key_by_name = {name: key for key, (name, _) in self.models.items()}
+        self._brain_key_by_name = {name: key for key, (name, _) in self.brain_modes.items()}
 
         # Defaults (Sonnet + Standard + Ocean)
         self.model_name, self.model_id = self.models["2"]
@@ -119,6 +197,9 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
         # Load saved preferences (overrides defaults if config exists)
         self.config_path = os.path.join(self.project_root, "config.json")
         self._load_config()
+        # Preference changes are written after the command that made them (see run());
+        # the exit hook is a backstop for anything still unsaved
+        atexit.register(self._flush_config)
 
         # Paths
         self.save_dir = os.path.join(self.project_root, "saved_chats")
@@ -126,6 +207,9 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
         # Voice (from VoiceMixin)
         self._init_voice()
 
+        # Web search (from WebMixin)
+        self._init_web()
+
         self.magic_words = {
             "switch_model": self.pick_model,
             "brain": self.pick_brain,
@@ -140,45 +224,59 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
             "export": self.export_conversation,
             "help": self.show_help,
         }
+        # Exit words and magic words share one lookup table, so each input
+        # costs a single dict lookup
+        self._dispatch = dict(self.magic_words)
+        self._dispatch.update(dict.fromkeys(self._EXIT_WORDS, self._EXIT))
 
         # --- PROMPT TOOLKIT SETUP ---
         self.history = InMemoryHistory()
         self.completer = ChatCompleter()
         self.auto_suggest = AutoSuggestFromHistory()
-        self._update_input_style()
+        self._on_theme_change()
 
-    def _update_input_style(self):
-        """Updates the Prompt Toolkit style to match the current theme."""
+    def _on_theme_change(self):
+        """Rebuilds everything derived from the current theme.
+        Updates the Prompt Toolkit style and caches the Rich markup tags used by _c/_b.
+        """
         self.input_style = PTStyle.from_dict({
             "prompt": self.theme["user_prompt"],
             "bottom-toolbar": f"bg:{self.theme['toolbar_bg']} {self.theme['toolbar_fg']}",
             "bottom-toolbar.text": f"bg:{self.theme['toolbar_bg']} {self.theme['toolbar_fg']}",
         })
+        # color key -> (open, close, bold open, bold close)
+        self._markup = {
+            key: (f"[{color}]", f"[/{color}]", f"[bold {color}]", f"[/bold {color}]")
+            for key, color in self.theme.items()
+        }
 
     # --- THEME HELPERS ---
 
     def _c(self, text, color_key="primary"):
         """Wraps text in the theme's color."""
-        color = self.theme[color_key]
-        return f"[{color}]{text}[/{color}]"
+        open_tag, close_tag, _, _ = self._markup[color_key]
+        return f"{open_tag}{text}{close_tag}"
 
     def _b(self, text, color_key="primary"):
         """Wraps text in bold + theme color."""
-        color = self.theme[color_key]
-        return f"[bold {color}]{text}[/bold {color}]"
+        _, _, open_tag, close_tag = self._markup[color_key]
+        return f"{open_tag}{text}{close_tag}"
 
     # --- STATUS & INPUT ---
 
+    BRAIN_COLORS = {128: "green", 512: "cyan", 1024: "blue", 2048: "magenta", 4096: "red"}
+
     def _print_status(self):
         """Prints current settings in a neat colored line."""
-        brain_colors = {128: "green", 512: "cyan", 1024: "blue", 2048: "magenta", 4096: "red"}
-        brain_color = brain_colors.get(self.max_tokens, "yellow")
+        brain_color = self.BRAIN_COLORS.get(self.max_tokens, "yellow")
+        persona = self.system_prompt
         persona_label = (
-            f"[italic]{self.system_prompt[:30]}...[/italic]"
-            if len(self.system_prompt) > 30
-            else (f"[italic]{self.system_prompt}[/italic]" if self.system_prompt else "[dim]None[/dim]")
+            f"[italic]{persona[:30]}...[/italic]"
+            if len(persona) > 30
+            else (f"[italic]{persona}[/italic]" if persona else "[dim]None[/dim]")
         )
-        p = self.theme["primary"]
+        theme = self.theme
+        p = theme["primary"]
         self.console.print(
             f"  [dim]Model:[/dim] [bold {p}]{self.model_name}[/bold {p}]"
             f"  [dim]|[/dim]  "
@@ -186,36 +284,50 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
             f"  [dim]|[/dim]  "
             f"[dim]Persona:[/dim] {persona_label}"
             f"  [dim]|[/dim]  "
-            f"[dim]Theme:[/dim] [{p}]{self.theme['name']}[/{p}]"
+            f"[dim]Theme:[/dim] [{p}]{theme['name']}[/{p}]"
         )
 
-    def _print_token_usage(self, input_tokens, output_tokens):
-        """Prints token usage and estimated cost as a neat table."""
-        prices = self.PRICING.get(self.model_name, {"input": 3.00, "output": 15.00})
+    def _message_cost(self, input_tokens, output_tokens, cache_write=0, cache_read=0, model_name=None):
+        """Returns the estimated cost of one request in dollars (current model by default).
+        input_tokens is the uncached part; prompt-cache writes and reads are
+        billed at CACHE_WRITE_RATE / CACHE_READ_RATE times the input price.
+        """
+        prices = self.PRICING.get(model_name or self.model_name, {"input": 3.00, "output": 15.00})
+        billed_input = (
+            input_tokens
+            + cache_write * self.CACHE_WRITE_RATE
+            + cache_read * self.CACHE_READ_RATE
+        )
+        return (billed_input / 1_000_000) * prices["input"] + (output_tokens / 1_000_000) * prices["output"]
 
-        msg_cost_in = (input_tokens / 1_000_000) * prices["input"]
-        msg_cost_out = (output_tokens / 1_000_000) * prices["output"]
-        msg_cost_total = msg_cost_in + msg_cost_out
+    def _print_token_usage(self, input_tokens, output_tokens, cache_write=0, cache_read=0):
+        """Prints token usage and estimated cost as a neat table."""
+        msg_cost_total = self._message_cost(input_tokens, output_tokens, cache_write, cache_read)
+        msg_input = input_tokens + cache_write + cache_read
+        input_cell = f"{msg_input:,}"
+        if cache_read:
+            input_cell += f" [dim]({cache_read:,} cached)[/dim]"
 
         session_cost_total = self.total_cost
 
-        s = self.theme["secondary"]
+        theme = self.theme
+        w = theme["warning"]
         table = Table(
             show_header=True,
-            header_style=f"bold {self.theme['warning']}",
+            header_style=f"bold {w}",
             border_style="dim",
             title=f"Usage ({self.model_name})",
             title_style="dim",
             padding=(0, 1),
         )
         table.add_column("", style="dim", width=12)
-        table.add_column("Input", style=self.theme["primary"], justify="right")
-        table.add_column("Output", style=s, justify="right")
-        table.add_column("Cost", style=self.theme["warning"], justify="right")
+        table.add_column("Input", style=theme["primary"], justify="right")
+        table.add_column("Output", style=theme["secondary"], justify="right")
+        table.add_column("Cost", style=w, justify="right")
 
         table.add_row(
             "This msg",
-            f"{input_tokens:,}",
+            input_cell,
             f"{output_tokens:,}",
             f"${msg_cost_total:.4f}",
         )
@@ -230,7 +342,7 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
 
     def _get_toolbar(self):
         """Returns the bottom toolbar text."""
-        msgs = len(self.conversation) // 2
+        msgs = self._exchanges
         return HTML(
             f"  <b>Model:</b> {self.model_name}  <b>|</b>  "
             f"<b>Brain:</b> {self.brain_name}  <b>|</b>  "
@@ -253,6 +365,21 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
 
     # --- SETTINGS PICKERS ---
 
+    # Static picker rows, built once for the class rather than on every call
+    MODEL_ROWS = (
+        ("1", "Opus", "Most powerful, slowest"),
+        ("2", "Sonnet", "Balanced speed & quality"),
+        ("3", "Haiku", "Fastest, cheapest"),
+    )
+
+    BRAIN_ROWS = (
+        ("1", "Minimal",  "128",  "One-liners, yes/no, definitions"),
+        ("2", "Concise",  "512",  "Short explanations, quick help"),
+        ("3", "Standard", "1024", "Normal conversations, Q&A"),
+        ("4", "Detailed", "2048", "Thorough explanations, code generation"),
+        ("5", "Maximum",  "4096", "Long-form content, full documents"),
+    )
+
     def pick_model(self):
         """Asks the user to choose a model with a pretty table."""
         p = self.theme["primary"]
@@ -261,9 +388,8 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
         table.add_column("Model", style="bold")
         table.add_column("Description", style="dim")
 
-        table.add_row("1", "Opus", "Most powerful, slowest")
-        table.add_row("2", "Sonnet", "Balanced speed & quality")
-        table.add_row("3", "Haiku", "Fastest, cheapest")
+        for row in self.MODEL_ROWS:
+            table.add_row(*row)
 
         self.console.print()
         self.console.print(table)
@@ -276,7 +402,7 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
             if choice in self.models:
                 self.model_name, self.model_id = self.models[choice]
                 self.console.print(f"  {self._b('-> Model set to: ' + self.model_name, 'success')}")
-                self._save_config()
+                self._mark_config_dirty()
                 break
             else:
                 self.console.print(f"  [{self.theme['error']}]Invalid choice. Enter 1, 2, or 3.[/{self.theme['error']}]")
@@ -290,11 +416,8 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
         table.add_column("Tokens", justify="right", style="dim")
         table.add_column("Best for", style="dim")
 
-        table.add_row("1", "Minimal",  "128",  "One-liners, yes/no, definitions")
-        table.add_row("2", "Concise",  "512",  "Short explanations, quick help")
-        table.add_row("3", "Standard", "1024", "Normal conversations, Q&A")
-        table.add_row("4", "Detailed", "2048", "Thorough explanations, code generation")
-        table.add_row("5", "Maximum",  "4096", "Long-form content, full documents")
+        for row in self.BRAIN_ROWS:
+            table.add_row(*row)
 
         self.console.print()
         self.console.print(table)
@@ -307,7 +430,7 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
             if choice in self.brain_modes:
                 self.brain_name, self.max_tokens = self.brain_modes[choice]
                 self.console.print(f"  {self._b(f'-> Response depth: {self.brain_name} ({self.max_tokens} tokens)', 'success')}")
-                self._save_config()
+                self._mark_config_dirty()
                 break
             else:
                 self.console.print(f"  [{self.theme['error']}]Invalid choice. Enter 1-5.[/{self.theme['error']}]")
@@ -339,9 +462,9 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
                 if 0 <= index < len(theme_list):
                     self.theme_key = theme_list[index]
                     self.theme = THEMES[self.theme_key]
-                    self._update_input_style()
+                    self._on_theme_change()
                     self.console.print(f"  {self._b('-> Theme set to: ' + self.theme['name'], 'success')}")
-                    self._save_config()
+                    self._mark_config_dirty()
                     break
                 else:
                     self.console.print(f"  [{self.theme['error']}]Invalid choice.[/{self.theme['error']}]")
@@ -412,8 +535,10 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
 
     def clear_conversation(self):
         """Clears the conversation history to start fresh."""
-        msg_count = len(self.conversation) // 2
+        msg_count = self._exchanges
         self.conversation = []
+        self._exchanges = 0
+        self._exchange_tokens = []
         self.console.print(
             f"  {self._b('-> Conversation cleared!', 'success')} "
             f"[dim]({msg_count} exchanges removed)[/dim]"
@@ -421,80 +546,198 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
 
     # --- CHAT ENGINE ---
 
-    def _trim_conversation(self):
-        """Trims oldest message pairs if approaching the context limit."""
-        if self.last_input_tokens < self.context_limit * 0.85:
+    @staticmethod
+    def _estimate_tokens(text):
+        """Cheap token estimate (~4 characters per token) for trimming decisions."""
+        return len(text) // 4
+
+    def _remaining_context_tokens(self):
+        """Roughly how many tokens the next prompt can add before history gets trimmed."""
+        used = max(self.last_input_tokens, sum(self._exchange_tokens))
+        return int(self.context_limit * self.TRIM_AT) - used
+
+    def _trim_conversation(self, incoming_tokens=0):
+        """Trims oldest exchanges before the next request gets close to the context limit.
+        Uses the real prompt size from the last reply, plus the cached per-exchange
+        estimates so a long history is trimmed before we pay to send it.
+        """
+        history_tokens = sum(self._exchange_tokens)
+        estimate = history_tokens + incoming_tokens
+        if max(self.last_input_tokens, estimate) < self.context_limit * self.TRIM_AT:
             return
 
-        trimmed = 0
-        target = int(len(self.conversation) * 0.7)
-        while len(self.conversation) > target and len(self.conversation) > 2:
-            if (len(self.conversation) >= 2
-                    and self.conversation[0]["role"] == "user"
-                    and self.conversation[1]["role"] == "assistant"):
-                self.conversation.pop(0)
-                self.conversation.pop(0)
-                trimmed += 1
-            else:
-                break
+        # send_message always adds user/assistant pairs, so exchange i is
+        # conversation[2*i:2*i+2] and no role checks are needed here
+        count = len(self._exchange_tokens)
+        drop = 0
+        if self.last_input_tokens >= self.context_limit * self.TRIM_AT:
+            # The API told us the prompt is too big: cut at least 30% like before
+            drop = count - int(count * 0.7)
+        drop = min(drop, count - 1)
+        remaining = estimate - sum(self._exchange_tokens[:drop])
+        # Keep cutting the oldest exchanges until the estimate is back under 75%
+        while drop < count - 1 and remaining > self.context_limit * self.TRIM_TO:
+            remaining -= self._exchange_tokens[drop]
+            drop += 1
+        if drop <= 0:
+            return
 
-        if trimmed:
-            self._print_warning(f"Memory trimmed: removed {trimmed} oldest exchanges to stay within context limit.")
+        # Replace the dropped exchanges with a short summary when we can get one,
+        # so Claude keeps the gist of the early conversation
+        summary = self._summarize_old_turns(self.conversation[:drop * 2])
+        if summary:
+            self.conversation[:drop * 2] = [
+                {"role": "user", "content": f"[Earlier conversation summary]\n{summary}"},
+                {"role": "assistant", "content": "Understood."},
+            ]
+            self._exchange_tokens[:drop] = [self._estimate_tokens(summary)]
+            self._exchanges -= drop - 1
+            self._print_warning(f"Memory trimmed: summarized {drop} oldest exchanges to stay within context limit.")
+        else:
+            # Drop whole exchanges with one slice deletion (a single memmove)
+            # instead of shifting the list on every pop(0)
+            del self.conversation[:drop * 2]
+            del self._exchange_tokens[:drop]
+            self._exchanges -= drop
+            self._print_warning(f"Memory trimmed: removed {drop} oldest exchanges to stay within context limit.")
+        self.last_input_tokens = 0  # stale now; the next reply reports the new size
+
+    def _summarize_old_turns(self, messages):
+        """Asks Haiku for a short summary of the given exchanges.
+        Returns the summary text, or None if the call fails (the turns are then just dropped).
+        """
+        summary_model_name, summary_model_id = self.models["3"]
+        self.console.print(f"  [dim]Summarizing {len(messages) // 2} oldest exchanges...[/dim]")
+        try:
+            response = self.client.messages.create(
+                model=summary_model_id,
+                max_tokens=256,
+                messages=messages + [{
+                    "role": "user",
+                    "content": "Summarize the conversation above in 200 tokens or less. "
+                               "Keep facts, decisions, and names needed to continue it.",
+                }],
+            )
+        except Exception:
+            return None
+
+        usage = response.usage
+        self.total_input_tokens += usage.input_tokens
+        self.total_output_tokens += usage.output_tokens
+        self.total_cost += self._message_cost(usage.input_tokens, usage.output_tokens, model_name=summary_model_name)
+        return "".join(block.text for block in response.content if block.type == "text").strip() or None
+
+    def _system_text(self):
+        """Returns base instructions + persona, rebuilt only when the persona changes."""
+        key = self.system_prompt
+        if key != self._system_cache_key:
+            self._system_cache = self.base_instructions + ("\n\n" + key if key else "")
+            self._system_cache_key = key
+        return self._system_cache
+
+    def _render_partial(self, text, done):
+        """Renders a reply that is still streaming in.
+        Finished blocks (everything up to the last blank line outside a code fence)
+        are parsed as Markdown exactly once and cached in `done`. The unfinished
+        tail is shown as plain text; the whole reply gets one full Markdown
+        render when streaming ends.
+        """
+        cut = text.rfind("\n\n")
+        while cut > len(done["text"]) and text.count("```", 0, cut) % 2:
+            cut = text.rfind("\n\n", 0, cut)
+        if cut > len(done["text"]):
+            new_blocks = text[len(done["text"]):cut].strip("\n")
+            done["text"] = text[:cut]
+            if new_blocks:
+                done["parts"] += [_markdown_class()(new_blocks), ""]
+
+        tail = text[len(done["text"]):].lstrip("\n")
+        return Group(*done["parts"], Text(tail))
 
     def send_message(self, user_msg, api_msg=None):
         """Sends a message to Claude using streaming.
         api_msg: if provided, sent to the API instead of user_msg (e.g. with search context).
                  The clean user_msg is what gets stored in conversation history.
         """
-        self._trim_conversation()
-        self.conversation.append({"role": "user", "content": user_msg})
-
-        if api_msg:
-            messages = self.conversation[:-1] + [{"role": "user", "content": api_msg}]
-        else:
-            messages = self.conversation
+        self.stop_speaking()  # a new message interrupts the previous spoken reply
+        self._trim_conversation(self._estimate_tokens(api_msg or user_msg))
+        clean_entry = {"role": "user", "content": user_msg}
+        self.conversation.append(clean_entry)
 
         try:
             api_args = {
                 "model": self.model_id,
                 "max_tokens": self.max_tokens,
-                "messages": messages,
+                "messages": self.conversation,
             }
-            system = self.base_instructions
-            if self.system_prompt:
-                system += "\n\n" + self.system_prompt
-            api_args["system"] = system
+            # Mark the stable prefix (system prompt, then history up to the last
+            # reply) as cacheable, so the next turn reads it at the cached rate
+            api_args["system"] = [
+                {"type": "text", "text": self._system_text(), "cache_control": _EPHEMERAL},
+            ]
 
+            Markdown = _markdown_class()
             chunks = []
-
-            with self.client.messages.stream(**api_args) as stream:
-                self.console.print(Panel.fit(
-                    self._b("Claude"),
-                    border_style=self.theme["primary"],
-                ))
-
-                with Live(console=self.console, refresh_per_second=15) as live:
-                    for text_chunk in stream.text_stream:
-                        chunks.append(text_chunk)
-                        live.update(Markdown("".join(chunks)))
-
-            full_response = "".join(chunks)
+            done = {"text": "", "parts": []}  # finished blocks, parsed once
+            period = 1 / self.STREAM_FPS
+            next_render = 0.0  # render the first chunk straight away
+
+            # Swap api_msg and the cache marker in for this one request instead of
+            # copying the whole history; the clean entries are put back afterwards
+            if api_msg:
+                self.conversation[-1] = {"role": "user", "content": api_msg}
+            prefix_entry = self.conversation[-2] if len(self.conversation) >= 2 else None
+            if prefix_entry is not None and prefix_entry["content"]:
+                self.conversation[-2] = {
+                    "role": prefix_entry["role"],
+                    "content": [
+                        {"type": "text", "text": prefix_entry["content"], "cache_control": _EPHEMERAL},
+                    ],
+                }
+            try:
+                with self.client.messages.stream(**api_args) as stream:
+                    self.console.print(Panel.fit(
+                        self._b("Claude"),
+                        border_style=self.theme["primary"],
+                    ))
+
+                    with Live(console=self.console, refresh_per_second=self.STREAM_FPS) as live:
+                        for text_chunk in stream.text_stream:
+                            chunks.append(text_chunk)
+                            # Live only redraws STREAM_FPS times a second, so skip the
+                            # render work for frames that would never be shown — except
+                            # when a paragraph just ended, so finished blocks show up promptly.
+                            # A chunk of only spaces changes nothing on screen, so wait for real text.
+                            now = time.monotonic()
+                            if "\n\n" in text_chunk or (now >= next_render and not text_chunk.isspace()):
+                                live.update(self._render_partial("".join(chunks), done))
+                                next_render = now + period
+
+                        full_response = "".join(chunks)
+                        live.update(Markdown(full_response))
+            finally:
+                self.conversation[-1] = clean_entry
+                if prefix_entry is not None:
+                    self.conversation[-2] = prefix_entry
 
             final_message = stream.get_final_message()
-            input_tokens = final_message.usage.input_tokens
-            output_tokens = final_message.usage.output_tokens
-
-            self.last_input_tokens = input_tokens
-            self.total_input_tokens += input_tokens
+            usage = final_message.usage
+            input_tokens = usage.input_tokens
+            output_tokens = usage.output_tokens
+            cache_write = usage.cache_creation_input_tokens or 0
+            cache_read = usage.cache_read_input_tokens or 0
+
+            # input_tokens only counts the uncached part of the prompt
+            self.last_input_tokens = input_tokens + cache_write + cache_read
+            self.total_input_tokens += self.last_input_tokens
             self.total_output_tokens += output_tokens
-
-            prices = self.PRICING.get(self.model_name, {"input": 3.00, "output": 15.00})
-            self.total_cost += (input_tokens / 1_000_000) * prices["input"]
-            self.total_cost += (output_tokens / 1_000_000) * prices["output"]
+            self.total_cost += self._message_cost(input_tokens, output_tokens, cache_write, cache_read)
 
             self.conversation.append({"role": "assistant", "content": full_response})
+            self._exchanges += 1
+            self._exchange_tokens.append(self._estimate_tokens(user_msg) + self._estimate_tokens(full_response))
 
-            self._print_token_usage(input_tokens, output_tokens)
+            self._print_token_usage(input_tokens, output_tokens, cache_write, cache_read)
 
             if self.voice_mode:
                 self.speak(full_response)
@@ -517,7 +760,7 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
 
     def _show_session_summary(self):
         """Shows a recap of the session before exiting."""
-        msgs = len(self.conversation) // 2
+        msgs = self._exchanges
 
         if msgs == 0:
             self.console.print(Panel("[bold]Goodbye![/bold]", border_style=self.theme["warning"]))
@@ -545,35 +788,58 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
 
     # --- FILE CONTEXT ---
 
+    MAX_FILE_BYTES = 100_000  # largest file @file will attach
+
     def _extract_file_refs(self, message):
         """Extracts @file paths from a message. Returns (file_paths, clean_message)."""
-        file_paths = re.findall(r'@file\s+([\S]+)', message)
-        clean = re.sub(r'@file\s+[\S]+\s*', '', message).strip()
-        return file_paths, clean
+        # Most messages have no refs — skip the regex engine entirely for them
+        if "@file" not in message:
+            return [], message.strip()
+
+        file_paths = []
+        parts = []
+        last = 0
+        # One pass: collect each path and keep the text between the refs
+        for match in _FILE_REF_RE.finditer(message):
+            file_paths.append(match.group(1))
+            parts.append(message[last:match.start()])
+            last = match.end()
+        parts.append(message[last:])
+        return file_paths, "".join(parts).strip()
 
     def _read_files(self, file_paths):
-        """Reads files and returns formatted context string. Shows UI feedback."""
+        """Reads files and returns a list of formatted file blocks (empty if none loaded).
+        Shows UI feedback. The caller joins the blocks with the message in one go.
+        """
         context_parts = []
 
         for path in file_paths:
-            if not os.path.isabs(path):
-                full_path = os.path.join(self.project_root, path)
-            else:
-                full_path = path
+            full_path = path if os.path.isabs(path) else self._project_root_sep + path
 
-            if not os.path.isfile(full_path):
+            # One stat() call gives us both "is it a file?" and its size
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                st = None
+            if st is None or not stat.S_ISREG(st.st_mode):
                 self._print_error(f"File not found: {path}", "Paths are relative to the project root. Example: @file chat/app.py")
                 continue
 
-            size = os.path.getsize(full_path)
-            if size > 100_000:
+            size = st.st_size
+            if size > self.MAX_FILE_BYTES:
                 self._print_error(f"File too large: {path} ({size:,} bytes)", "Max file size is 100KB. Try a smaller file or split it up.")
                 continue
 
             try:
-                with open(full_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                line_count = content.count("\n") + 1
+                # Read raw bytes up to the cap (one byte over tells us the file grew
+                # past it since the stat), count lines on the bytes, then decode once
+                with open(full_path, "rb") as f:
+                    raw = f.read(self.MAX_FILE_BYTES + 1)
+                if len(raw) > self.MAX_FILE_BYTES:
+                    self._print_error(f"File too large: {path}", "Max file size is 100KB. Try a smaller file or split it up.")
+                    continue
+                line_count = raw.count(b"\n") + 1
+                content = raw.decode("utf-8")
                 self.console.print(f"  {self._c('Loaded:', 'accent')} {self._b(path)} [dim]({line_count} lines)[/dim]")
                 context_parts.append(f"[File: {path} ({line_count} lines)]\n\n{content}")
             except UnicodeDecodeError:
@@ -583,7 +849,7 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
             except Exception as e:
                 self._print_error(f"Could not read {path}", str(e))
 
-        return "\n\n---\n\n".join(context_parts) if context_parts else None
+        return context_parts
 
     # --- INPUT DISPATCHER ---
 
@@ -591,12 +857,13 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
         """Decides what to do with the user's input."""
         stripped = user_msg.strip().lower()
 
-        if stripped in ("quit", "exit", "q"):
+        handler = self._dispatch.get(stripped)
+        if handler is self._EXIT:
             self._show_session_summary()
             return False
 
-        if stripped in self.magic_words:
-            self.magic_words[stripped]()
+        if handler is not None:
+            handler()
             self._print_status()
             return True
 
@@ -604,9 +871,11 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
         if "@file " in user_msg:
             file_paths, clean_msg = self._extract_file_refs(user_msg)
             if file_paths:
-                file_context = self._read_files(file_paths)
-                if file_context:
-                    augmented = f"{file_context}\n\n---\n\n{clean_msg or 'Explain this code.'}"
+                file_blocks = self._read_files(file_paths)
+                if file_blocks:
+                    # One join builds the whole prompt, so file contents are copied once
+                    file_blocks.append(clean_msg or "Explain this code.")
+                    augmented = "\n\n---\n\n".join(file_blocks)
                     self.send_message(clean_msg or user_msg, api_msg=augmented)
                 else:
                     if clean_msg:
@@ -659,6 +928,9 @@ class ClaudeChat(DisplayMixin, VoiceMixin, StorageMixin, WebMixin):
                         continue
 
                 keep_going = self.handle_input(user_msg)
+                # Save any preference a picker just changed. atexit doesn't run when the
+                # terminal window is closed, so waiting for exit could lose it
+                self._flush_config()
                 if not keep_going:
                     break
                 self.console.rule(style="dim")
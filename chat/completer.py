@@ -1,10 +1,23 @@
 import os
 import json
+from bisect import bisect_left
+
+# Optional: typo-tolerant matching when nothing starts with what was typed
+try:
+    from rapidfuzz import process as fuzz_process, fuzz
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    HAS_RAPIDFUZZ = False
 
 from rich.console import Console
 from prompt_toolkit.completion import Completer, Completion
 
 
+# Parsed prompts per file path: path -> (mtime_ns, items, sorted_keys).
+# Creating another completer reuses them until prompts.json is edited.
+_PROMPTS_CACHE = {}
+
+
 class ChatCompleter(Completer):
     """
     Custom autocomplete that loads prompts from prompts.json.
@@ -13,20 +26,40 @@ class ChatCompleter(Completer):
     Prompts are organized by category in the JSON file for easy editing.
     """
 
+    MIN_PREFIX = 2    # one letter matches too much of the list to be useful
+    MAX_RESULTS = 30  # enough to fill the menu; more only slows down typing
+    FUZZY_MIN_PREFIX = 3  # fuzzy matches on 1-2 letters are mostly noise
+    FUZZY_MAX_WORDS = 2   # longer input is a real message, not a mistyped prompt start
+    FUZZY_CUTOFF = 80     # rapidfuzz score (0-100) a prompt needs to be suggested
+
     def __init__(self):
         self.items = []
+        self._sorted_keys = []
         self._load_prompts()
+        # Lowercase prompt texts in file order, for the rapidfuzz fallback
+        self._fuzzy_choices = [text.lower() for text, _ in self.items] if HAS_RAPIDFUZZ else []
+        self._longest_prompt = max((len(text) for text, _ in self.items), default=0)
 
     def _load_prompts(self):
         """Loads all prompt entries from prompts.json into a flat list."""
         # prompts.json lives in the project root (one level up from chat/)
         prompts_path = os.path.join(os.path.dirname(__file__), "..", "prompts.json")
         try:
-            with open(prompts_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            for category in data.values():
-                for entry in category:
-                    self.items.append((entry["text"], entry["desc"]))
+            mtime = os.stat(prompts_path).st_mtime_ns
+            cached = _PROMPTS_CACHE.get(prompts_path)
+            if cached is None or cached[0] != mtime:
+                with open(prompts_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                items = []
+                for category in data.values():
+                    for entry in category:
+                        items.append((entry["text"], entry["desc"]))
+                # Sorted (lowercase text, file position) keys, so a prefix lookup is a
+                # binary search instead of a scan over every prompt on each keystroke
+                sorted_keys = sorted((text.lower(), i) for i, (text, _) in enumerate(items))
+                cached = (mtime, items, sorted_keys)
+                _PROMPTS_CACHE[prompts_path] = cached
+            _, self.items, self._sorted_keys = cached
         except FileNotFoundError:
             Console().print("[yellow]Warning: prompts.json not found, autocomplete disabled.[/yellow]")
         except (json.JSONDecodeError, KeyError) as e:
@@ -35,12 +68,38 @@ class ChatCompleter(Completer):
     def get_completions(self, document, complete_event):
         text = document.text
         text_lower = text.lower()
+        if len(text_lower) < self.MIN_PREFIX:
+            return
+
+        # All prompts starting with text_lower sit next to each other in the sorted keys
+        keys = self._sorted_keys
+        i = bisect_left(keys, (text_lower,))
+        matches = []
+        while i < len(keys) and keys[i][0].startswith(text_lower):
+            matches.append(keys[i][1])
+            i += 1
+
+        # Show matches in prompts.json order, like before
+        matches.sort()
+        if (not matches and HAS_RAPIDFUZZ
+                and self.FUZZY_MIN_PREFIX <= len(text_lower) <= self._longest_prompt
+                and len(text_lower.split()) <= self.FUZZY_MAX_WORDS):
+            # No prompt starts with the text (often a typo) — let rapidfuzz find close ones.
+            # Compare against the same number of letters from each prompt, so "expalin"
+            # is scored against "explain" and not against the whole prompt.
+            size = len(text_lower)
+            prefixes = [choice[:size] for choice in self._fuzzy_choices]
+            hits = fuzz_process.extract(
+                text_lower, prefixes, scorer=fuzz.ratio,
+                limit=self.MAX_RESULTS, score_cutoff=self.FUZZY_CUTOFF,
+            )
+            matches = [index for _, _, index in hits]  # best score first
 
-        for item_text, description in self.items:
-            if item_text.lower().startswith(text_lower) and text_lower:
-                yield Completion(
-                    text=item_text,
-                    start_position=-len(text),
-                    display=item_text.strip(),
-                    display_meta=description,
-                )
+        for index in matches[:self.MAX_RESULTS]:
+            item_text, description = self.items[index]
+            yield Completion(
+                text=item_text,
+                start_position=-len(text),
+                display=item_text.strip(),
+                display_meta=description,
+            )
@@ -1,15 +1,74 @@
+import sys
 import time
+from contextlib import contextmanager
+from itertools import groupby
+
+# Used to notice a keypress during the help animation without waiting for Enter
+try:
+    import msvcrt  # Windows
+except ImportError:
+    msvcrt = None
+    import select
+    import termios
+    import tty
 
 from rich.panel import Panel
-from rich.text import Text
+from rich.text import Text, Span
 from rich.live import Live
 
 
+def _hue_to_rgb(h):
+    """Converts a hue (0.0-1.0) to an RGB tuple. Full saturation, high brightness."""
+    h6 = h * 6.0
+    x = int(255 * (1 - abs(h6 % 2 - 1)))
+    sector = int(h6) % 6
+    return [
+        (255, x, 0), (x, 255, 0), (0, 255, x),
+        (0, x, 255), (x, 0, 255), (255, 0, x),
+    ][sector]
+
+
+def _key_waiting():
+    """True if the user has pressed a key that nobody has read yet."""
+    if msvcrt is not None:
+        return msvcrt.kbhit()
+    return bool(select.select([sys.stdin], [], [], 0)[0])
+
+
+@contextmanager
+def _single_key_mode():
+    """On POSIX terminals, makes single keypresses visible to _key_waiting()
+    (no Enter needed, no echo) and restores the terminal afterwards.
+    Pending keys stay in the buffer, so the prompt still gets them.
+    """
+    if msvcrt is not None or not sys.stdin.isatty():
+        yield
+        return
+    fd = sys.stdin.fileno()
+    old_settings = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)
+        yield
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+
+# Ready-made "bold #rrggbb" styles for HUE_STEPS points around the color wheel,
+# so the help animation indexes a list instead of doing color math per character.
+# A power of two lets the wrap-around be a bit mask instead of a modulo.
+HUE_STEPS = 1024
+HUE_MASK = HUE_STEPS - 1
+HUE_STYLES = [
+    f"bold #{r:02x}{g:02x}{b:02x}"
+    for r, g, b in (_hue_to_rgb(i / HUE_STEPS) for i in range(HUE_STEPS))
+]
+
+
 class DisplayMixin:
     """
     Mixin that handles all visual display for ClaudeChat.
     Banner, help panel, RGB animation, error panels.
-    Expects self.console, self.theme, self.HELP_COMMANDS from the main class.
+    Expects self.console, self.theme, self._c(), self.HELP_COMMANDS from the main class.
     """
 
     BANNER_LINES = [
@@ -46,72 +105,88 @@ class DisplayMixin:
         ("quit/exit/q",    "   - exit the chat"),
     ]
 
-    @staticmethod
-    def _hue_to_rgb(h):
-        """Converts a hue (0.0-1.0) to an RGB tuple. Full saturation, high brightness."""
-        h6 = h * 6.0
-        x = int(255 * (1 - abs(h6 % 2 - 1)))
-        sector = int(h6) % 6
-        return [
-            (255, x, 0), (x, 255, 0), (0, 255, x),
-            (0, x, 255), (x, 0, 255), (255, 0, x),
-        ][sector]
+    _hue_to_rgb = staticmethod(_hue_to_rgb)
+
+    _banner_panel = None  # built on first use, then reused
 
     def _print_banner(self):
         """Prints a large Claude-orange banner on startup."""
-        banner = Text()
-        for line in self.BANNER_LINES:
-            for char in line:
-                if char == " ":
-                    banner.append(char)
-                else:
-                    banner.append(char, style="bold #E07A5F")
-            banner.append("\n")
-
-        self.console.print(Panel(
-            banner,
-            subtitle="[dim]Your AI assistant in the terminal[/dim]",
-            border_style="#E07A5F",
-            padding=(1, 4),
-        ))
-
-    def _build_help_panel(self, offset=0.0):
-        """Builds the help panel with rainbow colors shifted by offset."""
+        if DisplayMixin._banner_panel is None:
+            banner = Text()
+            for line in self.BANNER_LINES:
+                # One append per run of spaces / block characters instead of per character
+                for is_space, run in groupby(line, key=lambda char: char == " "):
+                    run = "".join(run)
+                    if is_space:
+                        banner.append(run)
+                    else:
+                        banner.append(run, style="bold #E07A5F")
+                banner.append("\n")
+
+            DisplayMixin._banner_panel = Panel(
+                banner,
+                subtitle="[dim]Your AI assistant in the terminal[/dim]",
+                border_style="#E07A5F",
+                padding=(1, 4),
+            )
+
+        self.console.print(DisplayMixin._banner_panel)
+
+    def _build_help_text(self):
+        """Builds the help text once, without the rainbow colors.
+        Returns (text, base_spans, rainbow) where rainbow is a list of
+        (position, base_hue) for every character that cycles through the colors.
+        """
         help_text = Text()
-        help_text.append("Magic words:\n", style="bold")
+        rainbow = []
+
+        def add_rainbow(word, start_hue, step):
+            start = len(help_text)
+            rainbow.extend((start + i, start_hue + i * step) for i in range(len(word)))
+            help_text.append(word)
 
+        help_text.append("Magic words:\n", style="bold")
         for cmd_i, (name, desc) in enumerate(self.HELP_COMMANDS):
             help_text.append("  ")
-            for char_i, char in enumerate(name):
-                hue = (cmd_i / len(self.HELP_COMMANDS) + char_i * 0.03 + offset) % 1.0
-                r, g, b = self._hue_to_rgb(hue)
-                help_text.append(char, style=f"bold #{r:02x}{g:02x}{b:02x}")
+            add_rainbow(name, cmd_i / len(self.HELP_COMMANDS), 0.03)
             help_text.append(f"{desc}\n", style="dim")
 
         help_text.append("\n")
         help_text.append("Tips: ", style="bold")
         help_text.append("Press ", style="dim")
-        for i, c in enumerate("Tab"):
-            hue = (0.4 + i * 0.05 + offset) % 1.0
-            r, g, b = self._hue_to_rgb(hue)
-            help_text.append(c, style=f"bold #{r:02x}{g:02x}{b:02x}")
+        add_rainbow("Tab", 0.4, 0.05)
         help_text.append(" for autocomplete, ", style="dim")
-        for i, c in enumerate("Up Arrow"):
-            hue = (0.6 + i * 0.04 + offset) % 1.0
-            r, g, b = self._hue_to_rgb(hue)
-            help_text.append(c, style=f"bold #{r:02x}{g:02x}{b:02x}")
+        add_rainbow("Up Arrow", 0.6, 0.04)
         help_text.append(" for message history", style="dim")
 
-        return Panel(help_text, title="Help", title_align="left", border_style=self.theme["success"])
+        return help_text, list(help_text.spans), rainbow
+
+    def _help_frame_spans(self, base_spans, rainbow, offset):
+        """Returns the help text spans with the rainbow shifted by offset."""
+        return base_spans + [
+            Span(pos, pos + 1, HUE_STYLES[int((hue + offset) * HUE_STEPS) & HUE_MASK])
+            for pos, hue in rainbow
+        ]
 
     def show_help(self):
-        """Shows the help panel with live animated rainbow colors."""
+        """Shows the help panel with live animated rainbow colors.
+        Any keypress ends the animation early, so the user can start typing right away.
+        """
         frames = 60  # ~3 seconds at 20fps
-        with Live(self._build_help_panel(0), console=self.console, refresh_per_second=20) as live:
-            for frame in range(frames):
-                offset = frame / 40
-                live.update(self._build_help_panel(offset))
-                time.sleep(0.05)
+        help_text, base_spans, rainbow = self._build_help_text()
+        # Work out every frame's colors before the animation starts; each frame
+        # then just swaps the spans on the one Text/Panel that Live is showing
+        frame_spans = [self._help_frame_spans(base_spans, rainbow, frame / 40) for frame in range(frames)]
+        help_text.spans = frame_spans[0]
+        panel = Panel(help_text, title="Help", title_align="left", border_style=self.theme["success"])
+        sleep = time.sleep
+        with _single_key_mode(), Live(panel, console=self.console, refresh_per_second=20) as live:
+            for spans in frame_spans:
+                if _key_waiting():
+                    break
+                help_text.spans = spans
+                live.update(panel)
+                sleep(0.05)
 
     def _print_error(self, message, hint=None):
         """Prints a styled error panel. Optional hint tells the user what to do."""
@@ -122,4 +197,4 @@ class DisplayMixin:
 
     def _print_warning(self, message):
         """Prints a styled warning message."""
-        self.console.print(f"  [{self.theme['warning']}]{message}[/{self.theme['warning']}]")
+        self.console.print(f"  {self._c(message, 'warning')}")
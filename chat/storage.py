@@ -1,28 +1,79 @@
 import os
+import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Optional: orjson reads and writes JSON several times faster than the json module
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 from rich.table import Table
 
 from chat.themes import THEMES
 
 
+def _json_bytes(data, pretty=False):
+    """Serializes data to UTF-8 JSON bytes, using orjson when it's installed."""
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(data, indent=2 if pretty else None, ensure_ascii=False).encode("utf-8")
+
+
+def _read_json_file(path):
+    """Reads and parses a JSON file, using orjson when it's installed.
+    Bad JSON raises json.JSONDecodeError either way (orjson's error subclasses it).
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    if HAS_ORJSON:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def _is_valid_conversation(conversation):
+    """True if conversation is a list of user/assistant message pairs with text content,
+    which is the only shape ClaudeChat ever saves.
+    """
+    if not isinstance(conversation, list) or len(conversation) % 2:
+        return False
+    for i, msg in enumerate(conversation):
+        if not isinstance(msg, dict) or not isinstance(msg.get("content"), str):
+            return False
+        if msg.get("role") != ("user" if i % 2 == 0 else "assistant"):
+            return False
+    return True
+
+
 class StorageMixin:
     """
     Mixin that handles all persistence for ClaudeChat.
     Config preferences, conversation save/load, markdown export.
-    Expects self.console, self.conversation, self.system_prompt,
+    Expects self.console, self.conversation, self._exchanges, self._exchange_tokens,
+    self._estimate_tokens(), self.system_prompt,
     self.theme_key, self.theme, self.total_input_tokens, self.total_output_tokens,
-    self._b(), self._get_input(), self._update_input_style()
+    self._b(), self._get_input(), self._on_theme_change()
     """
 
     # --- CONFIG PERSISTENCE ---
 
+    def _current_config(self):
+        """Returns the current preferences as the dict stored in config.json."""
+        model_key = self._model_key_by_name.get(self.model_name, "2")
+        brain_key = self._brain_key_by_name.get(self.brain_name, "3")
+        return {"model": model_key, "brain": brain_key, "theme": self.theme_key}
+
     def _load_config(self):
         """Loads saved preferences from config.json if it exists."""
+        self._config_snapshot = None  # serialized config last read from / written to disk
+        self._config_dirty = False    # preferences changed since the last write
         try:
             with open(self.config_path, "r") as f:
                 cfg = json.load(f)
+            self._config_snapshot = json.dumps(cfg, sort_keys=True)
             model_key = cfg.get("model", "")
             if model_key in self.models:
                 self.model_name, self.model_id = self.models[model_key]
@@ -37,18 +88,69 @@ class StorageMixin:
             pass  # first launch — use defaults
 
     def _save_config(self):
-        """Saves current preferences to config.json."""
-        model_key = next((k for k, v in self.models.items() if v[0] == self.model_name), "2")
-        brain_key = next((k for k, v in self.brain_modes.items() if v[0] == self.brain_name), "3")
-        cfg = {"model": model_key, "brain": brain_key, "theme": self.theme_key}
+        """Saves current preferences to config.json. Skips the write if nothing changed."""
+        cfg = self._current_config()
+        snapshot = json.dumps(cfg, sort_keys=True)
+        if snapshot == self._config_snapshot:
+            return
         try:
             with open(self.config_path, "w") as f:
-                json.dump(cfg, f)
+                f.write(snapshot)
+            self._config_snapshot = snapshot
         except OSError:
             pass  # non-critical — preferences just won't persist this time
 
+    def _mark_config_dirty(self):
+        """Records that a preference changed; the write happens in _flush_config()."""
+        self._config_dirty = True
+
+    def _flush_config(self):
+        """Writes config.json if any preference changed. Called after each command and at exit."""
+        if self._config_dirty:
+            self._save_config()
+            self._config_dirty = False
+
     # --- CONVERSATION SAVE/LOAD ---
 
+    META_SUFFIX = ".meta.json"  # small sidecar next to each save, read by the load list
+
+    def _meta_path(self, filepath):
+        """Returns the sidecar path for a save file (chat_x.json -> chat_x.meta.json)."""
+        return filepath[:-len(".json")] + self.META_SUFFIX
+
+    def _write_file_atomic(self, filepath, data):
+        """Writes bytes (or an iterable of bytes pieces) to a temp file, then swaps it
+        into place in one step. A crash mid-write leaves the old file (or nothing),
+        never a half-written one.
+        """
+        tmp_path = filepath + ".tmp"
+        try:
+            # A big buffer turns many small piece writes into a few large ones
+            with open(tmp_path, "wb", buffering=1 << 20) as f:
+                if isinstance(data, bytes):
+                    f.write(data)
+                else:
+                    f.writelines(data)
+            os.replace(tmp_path, filepath)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _read_save_summary(self, filepath):
+        """Returns (model, exchanges) for a save file.
+        Reads the tiny sidecar when there is one; older saves are parsed in full.
+        """
+        try:
+            meta = _read_json_file(self._meta_path(filepath))
+            return meta["model"], meta["exchanges"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        data = _read_json_file(filepath)
+        return data.get("model", "Unknown"), len(data.get("conversation", [])) // 2
+
     def save_conversation(self):
         """Saves the current conversation to a JSON file."""
         if not self.conversation:
@@ -74,8 +176,10 @@ class StorageMixin:
         }
 
         try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(save_data, f, indent=2, ensure_ascii=False)
+            # Serialize in one go and write once, instead of many small writes
+            self._write_file_atomic(filepath, _json_bytes(save_data, pretty=True))
+            meta = {"timestamp": timestamp, "model": self.model_name, "exchanges": self._exchanges}
+            self._write_file_atomic(self._meta_path(filepath), _json_bytes(meta))
             self.console.print(f"  {self._b('-> Saved to: ' + filename, 'success')}")
         except PermissionError:
             self._print_error("Can't save conversation", "Permission denied — check folder permissions for saved_chats/.")
@@ -88,10 +192,16 @@ class StorageMixin:
             self._print_warning("No saved conversations found.")
             return
 
-        files = sorted(
-            [f for f in os.listdir(self.save_dir) if f.endswith(".json")],
-            reverse=True,
-        )
+        # scandir entries carry their path and (on Windows) their stat info, so
+        # sorting by modified time doesn't need a separate lookup per file
+        with os.scandir(self.save_dir) as it:
+            entries = [
+                e for e in it
+                if e.name.endswith(".json") and not e.name.endswith(self.META_SUFFIX) and e.is_file()
+            ]
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)  # newest first
+        files = [e.name for e in entries]
+        paths = [e.path for e in entries]
 
         if not files:
             self._print_warning("No saved conversations found.")
@@ -103,16 +213,22 @@ class StorageMixin:
         table.add_column("Model", style="dim")
         table.add_column("Messages", style="dim")
 
-        for i, filename in enumerate(files, 1):
-            filepath = os.path.join(self.save_dir, filename)
+        def summary_or_none(filepath):
             try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                msg_count = len(data.get("conversation", [])) // 2
-                model = data.get("model", "Unknown")
-                table.add_row(str(i), filename, model, str(msg_count))
+                return self._read_save_summary(filepath)
             except Exception:
+                return None
+
+        # Each file is independent, so read them in parallel to overlap the disk waits
+        with ThreadPoolExecutor(max_workers=min(8, len(paths))) as pool:
+            summaries = list(pool.map(summary_or_none, paths))
+
+        for i, (filename, summary) in enumerate(zip(files, summaries), 1):
+            if summary is None:
                 table.add_row(str(i), filename + " [red](corrupted)[/red]", "?", "?")
+            else:
+                model, msg_count = summary
+                table.add_row(str(i), filename, model, str(msg_count))
 
         self.console.print()
         self.console.print(table)
@@ -126,15 +242,28 @@ class StorageMixin:
         try:
             index = int(choice) - 1
             if 0 <= index < len(files):
-                filepath = os.path.join(self.save_dir, files[index])
+                filepath = paths[index]
                 try:
-                    with open(filepath, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                except (json.JSONDecodeError, OSError):
+                    data = _read_json_file(filepath)
+                except (ValueError, OSError):
+                    data = None
+                # Check the messages before touching any state, so a broken file
+                # can't leave the chat half-loaded
+                if not isinstance(data, dict) or not _is_valid_conversation(data.get("conversation", [])):
                     self._print_error(f"Can't load {files[index]}", "This save file is corrupted or unreadable.")
                     return
 
                 self.conversation = data.get("conversation", [])
+                # JSON parsing builds fresh role strings; intern them so they match the
+                # "user"/"assistant" literals by identity like freshly sent messages do.
+                # The check above guarantees every role is one of those two strings.
+                for msg in self.conversation:
+                    msg["role"] = sys.intern(msg["role"])
+                self._exchanges = len(self.conversation) // 2
+                self._exchange_tokens = [
+                    self._estimate_tokens(user["content"]) + self._estimate_tokens(reply["content"])
+                    for user, reply in zip(self.conversation[::2], self.conversation[1::2])
+                ]
                 self.system_prompt = data.get("system_prompt", "")
                 self.total_input_tokens = data.get("total_input_tokens", 0)
                 self.total_output_tokens = data.get("total_output_tokens", 0)
@@ -154,9 +283,9 @@ class StorageMixin:
                 if saved_theme in THEMES:
                     self.theme_key = saved_theme
                     self.theme = THEMES[saved_theme]
-                    self._update_input_style()
+                    self._on_theme_change()
 
-                msg_count = len(self.conversation) // 2
+                msg_count = self._exchanges
                 self.console.print(
                     f"  {self._b('-> Loaded ' + files[index], 'success')} "
                     f"[dim]({msg_count} exchanges restored)[/dim]"
@@ -185,25 +314,25 @@ class StorageMixin:
             f"",
             f"**Model:** {self.model_name}  ",
             f"**Date:** {datetime.now().strftime('%Y-%m-%d %H:%M')}  ",
-            f"**Messages:** {len(self.conversation) // 2} exchanges  ",
+            f"**Messages:** {self._exchanges} exchanges  ",
             f"**Cost:** ${self.total_cost:.4f}",
             f"",
             f"---",
             f"",
         ]
 
-        for msg in self.conversation:
-            role = "**You:**" if msg["role"] == "user" else "**Claude:**"
-            lines.append(role)
-            lines.append("")
-            lines.append(msg["content"])
-            lines.append("")
-            lines.append("---")
-            lines.append("")
+        def pieces():
+            # Yield the file a message at a time, so a long chat is never held
+            # in memory twice (once as lines, once as the joined text)
+            yield "\n".join(lines).encode("utf-8")
+            for msg in self.conversation:
+                role = "**You:**" if msg["role"] == "user" else "**Claude:**"
+                yield f"\n{role}\n\n".encode("utf-8")
+                yield msg["content"].encode("utf-8")
+                yield b"\n\n---\n"
 
         try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write("\n".join(lines))
+            self._write_file_atomic(filepath, pieces())
             self.console.print(f"  {self._b('-> Exported to: ' + filename, 'success')}")
         except PermissionError:
             self._print_error("Can't export conversation", "Permission denied — check folder permissions for saved_chats/.")
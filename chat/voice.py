@@ -15,6 +15,15 @@ except ImportError:
 from rich.table import Table
 
 
+# Markdown symbols that sound silly read aloud, and line breaks to turn into pauses
+_SPEECH_STRIP_RE = re.compile(r'[#*`_~\[\]\(\)]')
+_NEWLINES_RE = re.compile(r'\n+')
+
+# SAPI Speak flags: return right away instead of blocking, and cut off anything still playing
+SVSF_ASYNC = 1
+SVSF_PURGE_BEFORE_SPEAK = 2
+
+
 class VoiceMixin:
     """
     Mixin that adds voice input/output to ClaudeChat.
@@ -35,10 +44,13 @@ class VoiceMixin:
             self.speaker = win32com.client.Dispatch("SAPI.SpVoice")
             self.sapi_voices = self.speaker.GetVoices()
             self.current_voice_index = 0
+            self.speaker.Voice = self.sapi_voices.Item(self.current_voice_index)
             self.voice_rate = 2  # SAPI rate: -10 (slow) to 10 (fast), 2 = slightly faster than default
             self.speaker.Rate = self.voice_rate
             self.recognizer = sr.Recognizer()
             self.microphone = sr.Microphone()
+            self._noise_calibrated = False  # ambient noise is measured on the first listen
+            self._misheard_count = 0        # "could not understand" results in a row
             self.voice_available = True
         except Exception:
             # SAPI not available (e.g. Wine, server Windows, or COM error)
@@ -114,19 +126,30 @@ class VoiceMixin:
 
     def listen(self):
         """Listens to the microphone and returns the transcribed text."""
+        self.stop_speaking()  # don't let the mic pick up the previous reply
         self.console.print(f"  {self._c('Listening... (speak now)', 'accent')}", end="")
         try:
             with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
+                # Calibrating costs half a second of silence, so only do it when needed;
+                # the recognizer's dynamic threshold keeps adapting between calibrations
+                if not self._noise_calibrated:
+                    self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
+                    self._noise_calibrated = True
                 audio = self.recognizer.listen(source, timeout=10, phrase_time_limit=30)
             self.console.print(f"  [dim]Processing...[/dim]")
             text = self.recognizer.recognize_google(audio)
+            self._misheard_count = 0
             self.console.print(f"  {self._c('You said:', 'muted')} {self._b(text)}")
             return text
         except sr.WaitTimeoutError:
             self.console.print(f"\n  [{self.theme['warning']}]No speech detected. Try again or type your message.[/{self.theme['warning']}]")
             return None
         except sr.UnknownValueError:
+            # Two misses in a row usually means the room got louder — recalibrate next time
+            self._misheard_count += 1
+            if self._misheard_count >= 2:
+                self._noise_calibrated = False
+                self._misheard_count = 0
             self.console.print(f"\n  [{self.theme['warning']}]Could not understand. Try again or type your message.[/{self.theme['warning']}]")
             return None
         except sr.RequestError as e:
@@ -134,11 +157,18 @@ class VoiceMixin:
             return None
 
     def speak(self, text):
-        """Speaks the given text aloud using Windows SAPI."""
+        """Speaks the given text aloud using Windows SAPI.
+        Returns right away — the audio plays while the user reads or types.
+        """
+        if not self.voice_available:
+            return
+        clean = _NEWLINES_RE.sub('. ', _SPEECH_STRIP_RE.sub('', text))
+        # Voice and Rate are set on the speaker when they change (in _init_voice
+        # and pick_voice), so no COM property calls are needed here
+        self.speaker.Speak(clean, SVSF_ASYNC | SVSF_PURGE_BEFORE_SPEAK)
+
+    def stop_speaking(self):
+        """Cuts off any reply that is still being read aloud."""
         if not self.voice_available:
             return
-        clean = re.sub(r'[#*`_~\[\]\(\)]', '', text)
-        clean = re.sub(r'\n+', '. ', clean)
-        self.speaker.Voice = self.sapi_voices.Item(self.current_voice_index)
-        self.speaker.Rate = self.voice_rate
-        self.speaker.Speak(clean)
+        self.speaker.Speak("", SVSF_ASYNC | SVSF_PURGE_BEFORE_SPEAK)
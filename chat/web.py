@@ -1,18 +1,54 @@
 import re
-
-from ddgs import DDGS
+import threading
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 
 from rich.panel import Panel
 from rich.table import Table
 
 
 # Phrases that trigger a web search (must be specific to avoid false positives)
-SEARCH_TRIGGERS = [
+SEARCH_TRIGGERS = (
     "search for", "search about", "look up", "google",
     "find online", "what's the latest",
     "latest news", "current price", "weather in",
     "search the web", "look online", "web search",
-]
+)
+
+# All triggers in one compiled pattern, so detection is a single scan of the message.
+# Longest first, so where two triggers start at the same spot the longer one wins.
+# IGNORECASE means the message never has to be lowercased (copied) first.
+_TRIGGER_RE = re.compile(
+    "|".join(re.escape(trigger) for trigger in sorted(SEARCH_TRIGGERS, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+# Triggers that are commands ("search for X"), as opposed to ones that are also part of
+# what to search ("weather in Paris", "current price of oil", "google reviews").
+# Only these can start a second search in the same message.
+_SPLIT_TRIGGERS = frozenset({
+    "search for", "search about", "look up", "find online",
+    "search the web", "look online", "web search",
+})
+
+# "and" / "then" / a comma at the end of a query, meaning another search request follows
+# ("search for X and look up Y" is two searches)
+_JOINER_RE = re.compile(r'(?:[,;]|\s(?:and|then|also))+\s*$', re.IGNORECASE)
+
+# Whitespace and quotes trimmed off both ends of a query, in one strip() call
+_STRIP_CHARS = ' \t\n\r"\''
+
+
+def _domain(href):
+    """Returns the domain of a result URL ("https://www.python.org/doc" -> "python.org").
+    Plain prefix checks are all this needs — no regex.
+    """
+    if href.startswith("https://"):
+        href = href[8:]
+    elif href.startswith("http://"):
+        href = href[7:]
+    return href.removeprefix("www.").split('/', 1)[0]
 
 
 class WebMixin:
@@ -20,68 +56,175 @@ class WebMixin:
     Mixin that adds web search to ClaudeChat.
     Detects search intent in messages and fetches results from DuckDuckGo.
     Results are injected as context so Claude can answer with fresh info.
+    Expects self.console, self.theme, self._c(), self._b(), self._print_error(),
+    self._print_warning(), self._estimate_tokens(), self._remaining_context_tokens(),
+    self._trim_conversation(), self.send_message().
     """
 
+    SEARCH_CACHE_TTL = 300   # seconds a search result stays fresh enough to reuse
+    SEARCH_CACHE_SIZE = 128  # most queries remembered at once
+    EMPTY_CACHE_SIZE = 64    # most "nothing found" queries remembered at once
+    MAX_QUERIES = 3          # most separate searches run for one message
+    MAX_RESULTS = 5          # results per search when there's plenty of context left
+    RESULT_TOKENS = 100      # rough prompt size of one result (title + URL + snippet)
+
+    def _init_web(self):
+        """Sets up web search state. The DDGS client itself is created on the first search."""
+        self._ddgs = None
+        self._search_cache = {}  # (query, max_results) -> (time fetched, results), oldest first
+        self._empty_queries = {}  # query -> time it came back empty, oldest first
+        self._search_lock = threading.Lock()  # searches can run on several threads at once
+        self._search_pool = ThreadPoolExecutor(max_workers=4)  # threads start on first use
+
+    def _get_ddgs(self):
+        """Returns the shared DDGS client, creating it on first use.
+        DDGS keeps its search engines (and their HTTP connections) per instance,
+        so reusing one skips the DNS + TLS setup on every later search.
+        """
+        if self._ddgs is None:
+            from ddgs import DDGS  # imported on first search; it's slow to load at startup
+            self._ddgs = DDGS()
+        return self._ddgs
+
     def _has_search_intent(self, message):
         """Checks if the user's message wants a web search."""
-        msg_lower = message.lower()
-        return any(trigger in msg_lower for trigger in SEARCH_TRIGGERS)
-
-    def _extract_query(self, message):
-        """Extracts the search query from the user's message."""
-        msg_lower = message.lower()
-        for trigger in SEARCH_TRIGGERS:
-            if trigger in msg_lower:
-                # Get everything after the trigger phrase
-                idx = msg_lower.index(trigger) + len(trigger)
-                query = message[idx:].strip().strip('"').strip("'")
-                if query:
-                    return query
+        return _TRIGGER_RE.search(message) is not None
+
+    def _extract_queries(self, message):
+        """Extracts the search queries from the user's message.
+        Usually one, but "search for X and look up Y" gives ["X", "Y"].
+        """
+        # One scan finds every trigger in the order it appears in the message
+        matches = list(_TRIGGER_RE.finditer(message))
+        if not matches:
+            return [message]
+
+        # Get everything after the first trigger phrase. A later trigger only starts
+        # a new query when it's a command trigger, "and"/","/"then" comes before it,
+        # and something follows it; otherwise it stays part of the query
+        # ("look up the weather in Paris" and "search for X and google" stay one search).
+        splits = [m for m in matches[1:] if m.group().lower() in _SPLIT_TRIGGERS]
+        parts = []
+        start = matches[0].end()
+        for i, match in enumerate(splits):
+            before = message[start:match.start()]
+            joiner = _JOINER_RE.search(before)
+            next_start = splits[i + 1].start() if i + 1 < len(splits) else len(message)
+            after = _JOINER_RE.sub("", message[match.end():next_start]).strip(_STRIP_CHARS)
+            if joiner and after:
+                parts.append(before[:joiner.start()])
+                start = match.end()
+        parts.append(message[start:])
+
+        queries = [q for q in (part.strip(_STRIP_CHARS) for part in parts) if q]
         # Fallback: use the whole message
-        return message
+        return queries[:self.MAX_QUERIES] or [message]
 
-    def web_search(self, query, max_results=5):
-        """Searches DuckDuckGo and returns results."""
+    def _fetch_results(self, query, max_results):
+        """Returns DuckDuckGo results for a query, reusing recent results for the same query.
+        Queries that recently found nothing return [] without asking again.
+        """
+        query_key = query.lower()
+        key = (query_key, max_results)
+        now = time.monotonic()
+        with self._search_lock:
+            cached = self._search_cache.get(key)
+            empty_since = self._empty_queries.get(query_key)
+        if cached is not None and now - cached[0] < self.SEARCH_CACHE_TTL:
+            return cached[1]
+        if empty_since is not None and now - empty_since < self.SEARCH_CACHE_TTL:
+            return []
+
+        try:
+            # islice stops after max_results even if a DDGS version hands back a lazy
+            # generator (older releases did), so no extra result page gets requested
+            results = list(islice(self._get_ddgs().text(query, max_results=max_results), max_results))
+        except Exception as e:
+            # ddgs reports an empty search as an error; anything else is a real failure
+            if "no results found" not in str(e).lower():
+                raise
+            results = []
+
+        if not results:
+            with self._search_lock:
+                self._empty_queries.pop(query_key, None)
+                self._empty_queries[query_key] = now
+                if len(self._empty_queries) > self.EMPTY_CACHE_SIZE:
+                    del self._empty_queries[next(iter(self._empty_queries))]
+        else:
+            with self._search_lock:
+                # Re-insert so the dict stays ordered oldest -> newest, then evict the oldest
+                self._search_cache.pop(key, None)
+                self._search_cache[key] = (now, results)
+                if len(self._search_cache) > self.SEARCH_CACHE_SIZE:
+                    del self._search_cache[next(iter(self._search_cache))]
+        return results
+
+    def _print_searching(self, query):
+        """Shows which query is being searched."""
         self.console.print(f"  {self._c('Searching the web for:', 'accent')} {self._b(query)}")
 
+    def _start_searches(self, queries, max_results):
+        """Starts the searches on background threads and returns {query: future}.
+        Each future holds the results, or raises the search's error when read.
+        """
         try:
-            with DDGS() as ddgs:
-                results = list(ddgs.text(query, max_results=max_results))
+            self._get_ddgs()  # create the shared client before the threads use it
+        except Exception:
+            return {}  # e.g. ddgs not installed — web_search fetches itself and shows the error
+
+        pending = {}
+        for query in queries:
+            if query not in pending:
+                self._print_searching(query)
+                pending[query] = self._search_pool.submit(self._fetch_results, query, max_results)
+        return pending
+
+    def web_search(self, query, max_results=5, pending=None):
+        """Searches DuckDuckGo, shows the results table and returns the results
+        as (title, url, snippet) tuples (None if the search failed or found nothing).
+        pending: a future from _start_searches() already fetching this query.
+        """
+        try:
+            if pending is not None:
+                results = pending.result()  # re-raises the search's error, if any
+            else:
+                self._print_searching(query)
+                results = self._fetch_results(query, max_results)
 
             if not results:
-                self.console.print(f"  [{self.theme['warning']}]No results found.[/{self.theme['warning']}]")
+                self._print_warning("No results found.")
                 return None
 
-            # Show results table
-            table = Table(
-                title=f"Web Results ({len(results)})",
-                show_header=True,
-                header_style=f"bold {self.theme['accent']}",
-                border_style="dim",
-                padding=(0, 1),
-            )
-            table.add_column("#", style="bold", width=3)
-            table.add_column("Title", style="bold", max_width=40)
-            table.add_column("Source", style="dim", max_width=25)
+            # Show results table — only on a real terminal; piped output gets one plain line
+            table = None
+            if self.console.is_terminal:
+                table = Table(
+                    title=f"Web Results ({len(results)})",
+                    show_header=True,
+                    header_style=f"bold {self.theme['accent']}",
+                    border_style="dim",
+                    padding=(0, 1),
+                )
+                table.add_column("#", style="bold", width=3)
+                # Rich cuts long cells to one line with "…", so no manual slicing is needed
+                table.add_column("Title", style="bold", max_width=40, no_wrap=True, overflow="ellipsis")
+                table.add_column("Source", style="dim", max_width=25, no_wrap=True, overflow="ellipsis")
 
+            # One pass reads each result's fields once, for both the table and the prompt
+            rows = []
             for i, r in enumerate(results, 1):
-                title = r.get("title", "No title")
-                href = r.get("href", "")
-                # Extract domain from URL
-                domain = re.sub(r'https?://(www\.)?', '', href).split('/')[0] if href else ""
-                table.add_row(str(i), title[:40], domain[:25])
-
-            self.console.print(table)
-
-            # Build context string for Claude
-            context_parts = []
-            for r in results:
                 title = r.get("title", "")
-                body = r.get("body", "")
                 href = r.get("href", "")
-                context_parts.append(f"Title: {title}\nURL: {href}\nSnippet: {body}")
+                rows.append((title, href, r.get("body", "")))
+                if table is not None:
+                    table.add_row(str(i), title or "No title", _domain(href))
 
-            return "\n\n---\n\n".join(context_parts)
+            if table is not None:
+                self.console.print(table)
+            else:
+                self.console.print(f"  Found {len(rows)} web results.")
+            return rows
 
         except Exception as e:
             error_str = str(e).lower()
@@ -95,18 +238,41 @@ class WebMixin:
 
     def send_with_search(self, user_msg):
         """Searches the web, then sends the message to Claude with search context."""
-        query = self._extract_query(user_msg)
-        results = self.web_search(query)
-
-        if results:
-            # Build augmented message for the API only — clean user_msg goes in history
-            augmented_msg = (
-                f"{user_msg}\n\n"
-                f"[Web search results for: {query}]\n\n"
-                f"{results}\n\n"
-                f"Use the above web search results to help answer my question. "
-                f"Cite sources when relevant."
+        queries = self._extract_queries(user_msg)
+        # Ask for fewer results when the chat is close to being trimmed, so the
+        # snippets don't push it over (fewer bytes to fetch, fewer tokens to pay for)
+        budget = self._remaining_context_tokens() - self._estimate_tokens(user_msg)
+        max_results = max(1, min(self.MAX_RESULTS, budget // len(queries) // self.RESULT_TOKENS))
+
+        # Start the searches (all at once when there are several), and trim the history
+        # while they're on the network — trimming may itself wait on a summary request.
+        # send_message checks the trim again with the real prompt size.
+        pending = self._start_searches(queries, max_results)
+        self._trim_conversation(
+            self._estimate_tokens(user_msg) + len(queries) * max_results * self.RESULT_TOKENS
+        )
+
+        found = []  # (query, results) for every search that returned something
+        for query in queries:
+            results = self.web_search(query, max_results, pending.get(query))
+            if results:
+                found.append((query, results))
+
+        if found:
+            # Build augmented message for the API only — clean user_msg goes in history.
+            # All the pieces are joined once at the end, so each snippet is copied only once.
+            pieces = [user_msg]
+            for query, results in found:
+                pieces += ["\n\n[Web search results for: ", query, "]\n\n"]
+                for i, (title, href, body) in enumerate(results):
+                    if i:
+                        pieces.append("\n\n---\n\n")
+                    pieces += ["Title: ", title, "\nURL: ", href, "\nSnippet: ", body]
+            pieces.append(
+                "\n\nUse the above web search results to help answer my question. "
+                "Cite sources when relevant."
             )
+            augmented_msg = "".join(pieces)
             self.send_message(user_msg, api_msg=augmented_msg)
         else:
             # No results, send normally